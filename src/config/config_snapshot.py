@@ -0,0 +1,212 @@
+import os
+import struct
+import time
+from dataclasses import astuple
+from typing import BinaryIO
+
+from config.config_store import ButtonConfig, ConfigStore
+
+SNAPSHOT_MAGIC = b"SDLS"
+SNAPSHOT_VERSION = 3
+
+# Header: magic, version
+_HEADER = struct.Struct("<4sH")
+_COUNT = struct.Struct("<H")
+_STRING_LENGTH = struct.Struct("<H")
+_FRAME_LENGTH = struct.Struct("<I")
+# Button: selected, then the four colors with NO_COLOR for unset
+_BUTTON = struct.Struct("<B4i")
+# Frame: key index, background, foreground
+_FRAME = struct.Struct("<H2i")
+
+NO_COLOR = -1
+
+
+def _read(file: BinaryIO, layout: struct.Struct) -> tuple:
+    data = file.read(layout.size)
+    if len(data) < layout.size:
+        raise ValueError("Layout snapshot is truncated")
+    return layout.unpack(data)
+
+
+def _read_bytes(file: BinaryIO, length: int) -> bytes:
+    data = file.read(length)
+    if len(data) < length:
+        raise ValueError("Layout snapshot is truncated")
+    return data
+
+
+def _read_str(file: BinaryIO) -> str:
+    (length,) = _read(file, _STRING_LENGTH)
+    return _read_bytes(file, length).decode("utf-8")
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return _STRING_LENGTH.pack(len(data)) + data
+
+
+def _pack_color(color: int | None) -> int:
+    return NO_COLOR if color is None else color
+
+
+def _unpack_color(color: int) -> int | None:
+    return None if color == NO_COLOR else color
+
+
+class ConfigSnapshot:
+    """Last known button layout and encoded key frames, persisted so the deck can paint before NT connects"""
+
+    def __init__(self, path: str, debounce: float = 2.0, max_wait: float = 10.0):
+        self._path = path
+        self._debounce = debounce
+        self._max_wait = max_wait
+        self._load_complete = False
+        # Frames are only read from disk the first time a deck asks for one
+        self._frames_offset: int | None = None
+        self._frames_load_complete = False
+        # Stored as field tuples since live ButtonConfigs are updated in place
+        self._buttons: list[tuple] = []
+        self._buttons_version: int | None = None
+        self._deck_type: str = ""
+        # key index -> (render key, native key image)
+        self._frames: dict[int, tuple[tuple[int, int, str], bytes]] = dict()
+        # When the latest change was made, and when the unwritten changes started
+        self._dirty_time: float | None = None
+        self._first_dirty_time: float | None = None
+
+    def _ensure_load(self):
+        if self._load_complete:
+            return
+        self._load_complete = True
+
+        if not os.path.exists(self._path):
+            return
+
+        try:
+            with open(self._path, "rb") as f:
+                magic, version = _read(f, _HEADER)
+                if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                    print(f"Ignoring layout snapshot with version {version}")
+                    return
+                (count,) = _read(f, _COUNT)
+                buttons = []
+                for _ in range(count):
+                    key = _read_str(f)
+                    selected, *colors = _read(f, _BUTTON)
+                    active_text = _read_str(f)
+                    inactive_text = _read_str(f)
+                    buttons.append(
+                        (key, bool(selected), *(_unpack_color(color) for color in colors), active_text, inactive_text)
+                    )
+                self._buttons = buttons
+                self._frames_offset = f.tell()
+            print(f"Loaded layout snapshot with {len(self._buttons)} buttons")
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Error loading layout snapshot: {e}")
+
+    def _ensure_frames_load(self):
+        self._ensure_load()
+        if self._frames_load_complete:
+            return
+        self._frames_load_complete = True
+
+        if self._frames_offset is None:
+            return
+
+        try:
+            with open(self._path, "rb") as f:
+                f.seek(self._frames_offset)
+                deck_type = _read_str(f)
+                (count,) = _read(f, _COUNT)
+                frames = dict()
+                for _ in range(count):
+                    key, background, foreground = _read(f, _FRAME)
+                    text = _read_str(f)
+                    (length,) = _read(f, _FRAME_LENGTH)
+                    frames[key] = ((background, foreground, text), _read_bytes(f, length))
+            self._deck_type = deck_type
+            self._frames = frames
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print(f"Error loading layout snapshot frames: {e}")
+
+    def apply(self, config_store: ConfigStore):
+        """Seeds the config store with the snapshot layout, marked as stale until live data replaces it"""
+        self._ensure_load()
+        if self._buttons:
+            config_store.buttons = [ButtonConfig(*button) for button in self._buttons]
+            config_store.stale = True
+
+    def frame(self, deck_type: str, key: int, render_key: tuple[int, int, str]) -> bytes | None:
+        """Returns the stored encoded frame for a key if it was rendered for the same deck and appearance"""
+        self._ensure_frames_load()
+        if deck_type != self._deck_type:
+            return None
+        entry = self._frames.get(key)
+        if entry is None or entry[0] != render_key:
+            return None
+        return entry[1]
+
+    def record_buttons(self, buttons: list[ButtonConfig], version: int):
+        if version == self._buttons_version:
+            return
+        self._ensure_load()
+        self._buttons_version = version
+        button_tuples = [astuple(button) for button in buttons]
+        if button_tuples != self._buttons:
+            self._buttons = button_tuples
+            self._mark_dirty()
+
+    def record_frame(self, deck_type: str, key: int, render_key: tuple[int, int, str], image: bytes):
+        self._ensure_frames_load()
+        if deck_type != self._deck_type:
+            self._deck_type = deck_type
+            self._frames = dict()
+        entry = (render_key, bytes(image))
+        if self._frames.get(key) != entry:
+            self._frames[key] = entry
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty_time = time.monotonic()
+        if self._first_dirty_time is None:
+            self._first_dirty_time = self._dirty_time
+
+    def _serialize(self) -> bytes:
+        parts = [_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION), _COUNT.pack(len(self._buttons))]
+        for key, selected, *colors, active_text, inactive_text in self._buttons:
+            parts.append(_pack_str(key))
+            parts.append(_BUTTON.pack(selected, *(_pack_color(color) for color in colors)))
+            parts.append(_pack_str(active_text))
+            parts.append(_pack_str(inactive_text))
+
+        parts.append(_pack_str(self._deck_type))
+        parts.append(_COUNT.pack(len(self._frames)))
+        for key, ((background, foreground, text), image) in self._frames.items():
+            parts.append(_FRAME.pack(key, _pack_color(background), _pack_color(foreground)))
+            parts.append(_pack_str(text))
+            parts.append(_FRAME_LENGTH.pack(len(image)))
+            parts.append(image)
+        return b"".join(parts)
+
+    def flush(self, force: bool = False):
+        """Writes the snapshot once changes have settled for the debounce period, or have kept coming for max_wait"""
+        if self._dirty_time is None:
+            return
+        now = time.monotonic()
+        settled = now - self._dirty_time >= self._debounce
+        overdue = now - self._first_dirty_time >= self._max_wait
+        if not force and not settled and not overdue:
+            return
+        self._dirty_time = None
+        self._first_dirty_time = None
+
+        # The frames have to be in memory before the file they would be read from is replaced
+        self._ensure_frames_load()
+        temp_path = self._path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(self._serialize())
+            os.replace(temp_path, self._path)
+        except OSError as e:
+            print(f"Error writing layout snapshot: {e}")
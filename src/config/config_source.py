@@ -1,11 +1,12 @@
 import os
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
 import constants
 from nt_instances import nt_instance
 if constants.DO_SIM:
     from nt_instances import nt_instance_sim
 import ntcore
-from config.config_store import ButtonConfig, ConfigStore
+from config.config_store import APPEARANCE_SEPARATOR, ButtonConfig, ConfigStore
 
 class ConfigSource:
     def update(self, config_store: ConfigStore):
@@ -19,20 +20,42 @@ class EnvironmentConfigSource(ConfigSource):
         if constants.DO_SIM:
             config_store.server_ip_sim = os.environ.get("SD_NT_SERVER_IP_SIM", config_store.server_ip_sim)
         config_store.asset_directory = os.environ.get("SD_ASSET_DIRECTORY", config_store.asset_directory)
+        config_store.snapshot_path = os.environ.get("SD_SNAPSHOT_PATH", config_store.snapshot_path)
+        config_store.record_path = os.environ.get("SD_RECORD_PATH", config_store.record_path)
 
 @dataclass
 class ButtonSource:
     appearance: ntcore.StringSubscriber
     selected: ntcore.BooleanSubscriber
+    # Reused for every update, only re-parsed when the appearance string changes
+    config: ButtonConfig = field(default_factory=ButtonConfig)
+    last_appearance: str | None = None
+
+    def read(self) -> bool:
+        """Refreshes config from NT, returning whether anything changed"""
+        appearance = self.appearance.get()
+        selected = self.selected.get()
+        changed = selected != self.config.selected
+        self.config.selected = selected
+        if appearance != self.last_appearance:
+            self.config.set_appearance(appearance)
+            self.last_appearance = appearance
+            changed = True
+        return changed
 
 
 class NTConfigSource(ConfigSource):
     def __init__(self, num_buttons: int):
         self._init_complete = False
         self._num_buttons = num_buttons
+        self._connected_since: float | None = None
+        if constants.DO_SIM:
+            self._connected_since_sim: float | None = None
         self._button_sources: list[ButtonSource] = []
+        self._buttons: list[ButtonConfig] = []
         if constants.DO_SIM:
             self._button_sources_sim: list[ButtonSource] = []
+            self._buttons_sim: list[ButtonConfig] = []
 
     def update(self, config_store: ConfigStore):
         if not self._init_complete:
@@ -41,39 +64,72 @@ class NTConfigSource(ConfigSource):
                 table = deck_table.getSubTable(f"Button/{i}")
                 self._button_sources.append(
                     ButtonSource(
-                        table.getStringTopic("Appearance").subscribe(""+"$&$"+""+"$&$"+""+"$&$"+""+"$&$"+""+"$&$"+""+"$&$"+""),
+                        table.getStringTopic("Appearance").subscribe(APPEARANCE_SEPARATOR * 6),
                         table.getBooleanTopic("Selected").subscribe(False),
                     )
                 )
+                self._buttons.append(self._button_sources[-1].config)
                 if constants.DO_SIM:
                     deck_table_sim = nt_instance_sim.getTable("StreamDeck")
                     table = deck_table_sim.getSubTable(f"Button/{i}")
                     self._button_sources_sim.append(
                         ButtonSource(
-                            table.getStringTopic("Appearance").subscribe(""+"$&$"+""+"$&$"+""+"$&$"+""+"$&$"+""+"$&$"+""+"$&$"+""),
+                            table.getStringTopic("Appearance").subscribe(APPEARANCE_SEPARATOR * 6),
                             table.getBooleanTopic("Selected").subscribe(False),
                         )
                 )
+                    self._buttons_sim.append(self._button_sources_sim[-1].config)
             self._init_complete = True
 
         config_store.remote_connected = nt_instance.isConnected()
+        self._connected_since = self._track_connection(config_store.remote_connected, self._connected_since)
 
-        buttons = []
-        for button in self._button_sources:
-            appearance = button.appearance.get()
-            key, active_background, inactive_background, active_foreground, inactive_foreground, active_text, inactive_text = appearance.split("$&$")
-            buttons.append(ButtonConfig(key, button.selected.get(), active_background, inactive_background, active_foreground, inactive_foreground, active_text, inactive_text))
-        config_store.buttons = buttons
+        changed = False
+        for i, button in enumerate(self._button_sources):
+            if config_store.stale and not button.appearance.exists() and i < len(config_store.buttons):
+                # Keep showing the snapshot layout until this button's appearance has been published
+                changed |= self._buttons[i] is not config_store.buttons[i]
+                self._buttons[i] = config_store.buttons[i]
+                continue
+            changed |= button.read() or self._buttons[i] is not button.config
+            self._buttons[i] = button.config
+        config_store.buttons = self._buttons
+
+        if config_store.stale and self._live(self._button_sources, self._connected_since):
+            config_store.stale = False
 
         if constants.DO_SIM:
             config_store.remote_connected_sim = nt_instance_sim.isConnected()
+            self._connected_since_sim = self._track_connection(
+                config_store.remote_connected_sim, self._connected_since_sim
+            )
 
-            buttons = []
             for button in self._button_sources_sim:
-                appearance = button.appearance.get()
-                key, active_background, inactive_background, active_foreground, inactive_foreground, active_text, inactive_text = appearance.split("$&$")
-                buttons.append(ButtonConfig(key, button.selected.get(), active_background, inactive_background, active_foreground, inactive_foreground, active_text, inactive_text))
-            config_store.buttons_sim = buttons
+                changed |= button.read()
+            config_store.buttons_sim = self._buttons_sim
+
+            if config_store.stale and self._live(self._button_sources_sim, self._connected_since_sim):
+                config_store.stale = False
+
+        if changed:
+            config_store.buttons_version += 1
+
+    @staticmethod
+    def _track_connection(connected: bool, connected_since: float | None) -> float | None:
+        if not connected:
+            return None
+        return connected_since if connected_since is not None else time.monotonic()
+
+    @staticmethod
+    def _live(sources: list[ButtonSource], connected_since: float | None) -> bool:
+        """Whether the snapshot layout can be dropped in favour of live data"""
+        if connected_since is None:
+            return False
+        # The robot may publish fewer buttons than we subscribe to, so don't wait on every one forever
+        return (
+            all(source.appearance.exists() for source in sources)
+            or time.monotonic() - connected_since >= constants.STALE_GRACE_PERIOD
+        )
 
     def cleanup(self):
         """Close all subscribers to prevent resource leaks"""
@@ -1,22 +1,46 @@
+import sys
 from dataclasses import dataclass, field
 
-@dataclass
+from util.color_util import parse_color
+
+APPEARANCE_SEPARATOR = "$&$"
+
+
+@dataclass(slots=True)
 class ButtonConfig:
     key: str = ""
     selected: bool = False
-    active_background: str = ""
-    inactive_background: str = ""
-    active_foreground: str = ""
-    inactive_foreground: str = ""
+    # Colors are packed 0xRRGGBB, None when unset
+    active_background: int | None = None
+    inactive_background: int | None = None
+    active_foreground: int | None = None
+    inactive_foreground: int | None = None
     active_text: str = ""
     inactive_text: str = ""
 
+    def set_appearance(self, appearance: str):
+        """Updates this config in place from an NT appearance string"""
+        key, active_background, inactive_background, active_foreground, inactive_foreground, active_text, inactive_text = appearance.split(APPEARANCE_SEPARATOR)
+        # Interned so repeated labels share one string instead of a copy per update
+        self.key = sys.intern(key)
+        self.active_background = parse_color(active_background)
+        self.inactive_background = parse_color(inactive_background)
+        self.active_foreground = parse_color(active_foreground)
+        self.inactive_foreground = parse_color(inactive_foreground)
+        self.active_text = sys.intern(active_text)
+        self.inactive_text = sys.intern(inactive_text)
+
 @dataclass
 class ConfigStore:
     server_ip: str = ""
     server_ip_sim: str = ""
     asset_directory: str = ""
+    snapshot_path: str = ""
+    record_path: str = ""
     remote_connected: bool = False
     remote_connected_sim: bool = False
+    stale: bool = False
+    # Incremented whenever any button changes, buttons are updated in place
+    buttons_version: int = 0
     buttons: list[ButtonConfig] = field(default_factory=lambda: [])
     buttons_sim: list[ButtonConfig] = field(default_factory=lambda: [])
@@ -5,6 +5,11 @@ DO_SIM = False
 
 BACKGROUND_IMAGE = "sandspit_logo.png"
 TEXT_HEIGHT_OFFSET = 5
+BRIGHTNESS = 80
+STALE_BRIGHTNESS = 25
+STALE_GRACE_PERIOD = 2.0
+ICON_CACHE_MAX_BYTES = 4 * 1024 * 1024
+ICON_CACHE_MAX_KEYS = 2048
 
 @dataclass
 class COLORS:
@@ -5,20 +5,46 @@ from PIL import Image, ImageDraw, ImageFont, ImageOps
 from StreamDeck.Devices.StreamDeck import StreamDeck
 from StreamDeck.ImageHelpers import PILHelper
 from StreamDeck.Transport.Transport import TransportError
+from config.config_snapshot import ConfigSnapshot
 from config.config_store import ButtonConfig, ConfigStore
 
 from output.output_publisher import OutputPublisher
+from replay.recorder import Recorder
+from util.color_util import parse_color, to_rgb
+from util.frame_cache import FrameCache, frame_id
 import constants
 
+DEFAULT_BACKGROUND = parse_color(constants.COLORS.DEFAULT_BACKGROUND)
+DEFAULT_FOREGROUND = parse_color(constants.COLORS.DEFAULT_FOREGROUND)
+
 class StreamDeckController:
-    def __init__(self, deck: StreamDeck, config: ConfigStore, output_publisher: OutputPublisher, assets_path: str):
+    def __init__(
+        self,
+        deck: StreamDeck,
+        config: ConfigStore,
+        output_publisher: OutputPublisher,
+        assets_path: str,
+        snapshot: ConfigSnapshot | None = None,
+        recorder: Recorder | None = None,
+    ):
         self._deck = deck
         self._config = config
         self._output_publisher = output_publisher
         self._assets_path = assets_path
-        self._default_background = self.generate_key_images_from_deck_sized_image(constants.BACKGROUND_IMAGE)
-        self._icon_cache: dict[tuple[str, str, str], Image.Image] = dict()
-        self._last_images: list[tuple[str, any]] = [("none", None)] * deck.key_count()
+        self._snapshot = snapshot
+        self._recorder = recorder
+        self._brightness: int | None = None
+        self._default_background = {
+            k: self._pin_frame(image)
+            for k, image in self.generate_key_images_from_deck_sized_image(constants.BACKGROUND_IMAGE).items()
+        }
+        self._empty_key = self._pin_frame(
+            PILHelper.to_native_key_format(
+                deck, PILHelper.create_key_image(deck, background=constants.COLORS.NO_CONFIG)
+            )
+        )
+        self._icon_cache = FrameCache(constants.ICON_CACHE_MAX_BYTES, constants.ICON_CACHE_MAX_KEYS)
+        self._last_images: list[bytes | None] = [None] * deck.key_count()
 
         font = font_manager.FontProperties(family="Arial")
         self._font_file = font_manager.findfont(font)
@@ -101,27 +127,41 @@ class StreamDeckController:
 
         return key_images
 
-    def render_all_keys(self, key_images: dict):
-        for k in range(self._deck.key_count()):
-            key_image = key_images[k]
+    @staticmethod
+    def _pin_frame(image) -> tuple[bytes, bytes]:
+        """Identifies a frame that is kept outside the icon cache for the life of the controller"""
+        image = bytes(image)
+        return frame_id(image), image
+
+    def _write_frame(self, key: int, frame: tuple[bytes, bytes]):
+        # Only touch the device when the bytes on the key would actually change
+        fid, image = frame
+        if self._last_images[key] != fid:
+            self._deck.set_key_image(key, image)
+            self._last_images[key] = fid
+
+    def icon_cache_size(self) -> tuple[int, int, int]:
+        """Number of cached key frames, render keys pointing at them, and the frames' total size in bytes"""
+        return len(self._icon_cache), self._icon_cache.key_count, self._icon_cache.size_bytes
 
-            unique_key = ("render_all", None)
-            if self._last_images[k] != unique_key:
-                self._deck.set_key_image(k, key_image)
-                self._last_images[k] = unique_key
+    def render_all_keys(self, key_frames: dict[int, tuple[bytes, bytes]]):
+        for k in range(self._deck.key_count()):
+            self._write_frame(k, key_frames[k])
 
     def render_default_background(self):
         self.render_all_keys(self._default_background)
 
-    def render_key(self, background: str, foreground: str, text: str):
+    def render_key(self, background: int, foreground: int, text: str) -> tuple[bytes, bytes]:
+        """Renders a key image, returning the content hash and bytes of its encoded frame"""
         cache_key = (background, foreground, text)
-        if cache_key in self._icon_cache:
-            return PILHelper.to_native_key_format(self._deck, self._icon_cache[cache_key])
+        frame = self._icon_cache.get(cache_key)
+        if frame is not None:
+            return frame
 
-        image = PILHelper.create_key_image(self._deck, background=background)
+        image = PILHelper.create_key_image(self._deck, background=to_rgb(background))
         
         if text is None or text == "":
-            return PILHelper.to_native_key_format(self._deck, image)
+            return self._icon_cache.put(cache_key, PILHelper.to_native_key_format(self._deck, image))
         font_fraction = 0.8
 
         fontsize = 1
@@ -133,7 +173,7 @@ class StreamDeckController:
             font = ImageFont.truetype(self._font_file, fontsize)
             l, t, r, b = draw.multiline_textbbox((0,0), text, font)
         
-        draw.multiline_text((image.width/2, image.height/2), text, fill=foreground, font=font, anchor="mm", align="center")
+        draw.multiline_text((image.width/2, image.height/2), text, fill=to_rgb(foreground), font=font, anchor="mm", align="center")
 
         # draw.text(
         #     (image.width / 2, b-t + (image.height-(b-t))/2),#image.height - constants.TEXT_HEIGHT_OFFSET),
@@ -143,53 +183,67 @@ class StreamDeckController:
         #     fill=foreground,
         # )
 
-        self._icon_cache[cache_key] = image
-        return PILHelper.to_native_key_format(self._deck, image)
+        return self._icon_cache.put(cache_key, PILHelper.to_native_key_format(self._deck, image))
 
     def set_key_empty(self, key: int):
-        image = PILHelper.create_key_image(self._deck, background=constants.COLORS.NO_CONFIG)
-
-        unique_key = ("empty_key", None)
-        if self._last_images[key] != unique_key:
-            self._deck.set_key_image(key, PILHelper.to_native_key_format(self._deck, image))
-            self._last_images[key] = unique_key
+        self._write_frame(key, self._empty_key)
 
     def set_key_image(self, key: int, button: ButtonConfig):
         if button.selected:
-            background = button.active_background if button.active_background != "" else constants.COLORS.DEFAULT_BACKGROUND
-            foreground = button.active_foreground if button.active_foreground != "" else constants.COLORS.DEFAULT_FOREGROUND
+            background = button.active_background if button.active_background is not None else DEFAULT_BACKGROUND
+            foreground = button.active_foreground if button.active_foreground is not None else DEFAULT_FOREGROUND
             text = button.active_text
         else:
-            background = button.inactive_background if button.inactive_background != "" else constants.COLORS.DEFAULT_BACKGROUND
-            foreground = button.inactive_foreground if button.inactive_foreground != "" else constants.COLORS.DEFAULT_FOREGROUND
+            background = button.inactive_background if button.inactive_background is not None else DEFAULT_BACKGROUND
+            foreground = button.inactive_foreground if button.inactive_foreground is not None else DEFAULT_FOREGROUND
             text = button.inactive_text
-        image = self.render_key(background, foreground, text)
 
-        unique_key = ("render_key", (background, foreground, text))
-        if self._last_images[key] != unique_key:
-            self._deck.set_key_image(key, image)
-            self._last_images[key] = unique_key
+        cache_key = (background, foreground, text)
+        frame = self._icon_cache.get(cache_key)
+        if frame is None and self._snapshot is not None and self._config.stale:
+            image = self._snapshot.frame(self._deck.deck_type(), key, cache_key)
+            if image is not None:
+                frame = self._icon_cache.put(cache_key, image)
+        if frame is None:
+            frame = self.render_key(background, foreground, text)
+
+        if self._last_images[key] != frame[0]:
+            self._write_frame(key, frame)
+            if self._snapshot is not None:
+                self._snapshot.record_frame(self._deck.deck_type(), key, cache_key, frame[1])
 
     def on_key_change(self, _, key: int, selected: bool):
         print(f"{self._deck.get_serial_number()} Key {key} = {selected}", flush=True)
+        if self._recorder is not None:
+            self._recorder.record_key(key, selected)
+        if self._config.stale:
+            # The snapshot layout may not match what the robot will publish, so don't act on it
+            return
         self._output_publisher.send_button_selected(key, selected)
 
+    def update_brightness(self):
+        # Dim the deck while it is showing the snapshot layout so stale buttons are obvious
+        brightness = constants.STALE_BRIGHTNESS if self._config.stale else constants.BRIGHTNESS
+        if self._brightness != brightness:
+            self._deck.set_brightness(brightness)
+            self._brightness = brightness
+
     def update(self):
-        # TODO: Only send images on changes
-        if not self._config.remote_connected and not self._config.remote_connected_sim:
+        self.update_brightness()
+        if not self._config.remote_connected and not self._config.remote_connected_sim and not self._config.stale:
             self.render_default_background()
             return
 
-
         for key in range(self._deck.key_count()):
             if key < len(self._config.buttons):
-                if (self._config.buttons[key].active_background == "" and 
-                    self._config.buttons[key].inactive_background == "" and 
-                    self._config.buttons[key].active_foreground == "" and 
-                    self._config.buttons[key].inactive_foreground == "" and 
+                if (self._config.buttons[key].active_background is None and 
+                    self._config.buttons[key].inactive_background is None and 
+                    self._config.buttons[key].active_foreground is None and 
+                    self._config.buttons[key].inactive_foreground is None and 
                     self._config.buttons[key].active_text == "" and 
                     self._config.buttons[key].inactive_text == ""
-                    and constants.DO_SIM):
+                    and constants.DO_SIM
+                    and key < len(self._config.buttons_sim)):
                     button = self._config.buttons_sim[key]
                 else:
                     button = self._config.buttons[key]
@@ -218,7 +272,7 @@ class StreamDeckController:
             )
         )
 
-        self._deck.set_brightness(80)
+        self._brightness = None
         self._deck.set_key_callback(self.on_key_change)
 
         self.update()
@@ -8,9 +8,11 @@ from typing import Callable
 from StreamDeck.DeviceManager import DeviceManager
 from StreamDeck.Devices import StreamDeck
 from StreamDeck.Transport.Transport import TransportError
+from config.config_snapshot import ConfigSnapshot
 from config.config_source import ConfigSource, EnvironmentConfigSource, NTConfigSource
 from config.config_store import ConfigStore
 from output.output_publisher import NTOutputPublisher
+from replay.recorder import Recorder
 import constants
 
 from controller.stream_deck import StreamDeckController
@@ -27,6 +29,7 @@ def resource_path(filename):
 DEFAULT_SERVER_IP = "10.34.76.2"
 DEFAULT_SERVER_IP_SIM = "127.0.0.1" # for sim
 DEFAULT_ASSETS_PATH = os.path.join(os.path.dirname(__file__), "../assets")
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "../layout_snapshot.bin")
 NUM_BUTTONS = 32  # TODO: Base on deck or config
 MIN_LOOP_TIME = 0.02
 
@@ -40,15 +43,29 @@ def exit_gracefully(*_):
     _running = False
 
 
+def update_snapshot(config: ConfigStore, snapshot: ConfigSnapshot):
+    # Only persist layouts that came from a live robot
+    if config.remote_connected and not config.stale:
+        snapshot.record_buttons(config.buttons, config.buttons_version)
+    snapshot.flush()
+
+
 def main(running: Callable[[], bool]):
     config = ConfigStore()
     config.server_ip = DEFAULT_SERVER_IP
     config.server_ip_sim = DEFAULT_SERVER_IP_SIM
     config.asset_directory = DEFAULT_ASSETS_PATH
+    config.snapshot_path = DEFAULT_SNAPSHOT_PATH
     environment_config_source: ConfigSource = EnvironmentConfigSource()
+    environment_config_source.update(config)
+
     nt_config_source: ConfigSource = NTConfigSource(NUM_BUTTONS)
+    recorder = Recorder(config.record_path) if config.record_path else None
+    if recorder is not None:
+        recorder.listen(nt_instance)
 
-    environment_config_source.update(config)
+    snapshot = ConfigSnapshot(config.snapshot_path)
+    snapshot.apply(config)
     
     nt_instance.setServer(config.server_ip)
     nt_instance.startClient4(config.server_ip)
@@ -72,6 +89,7 @@ def main(running: Callable[[], bool]):
 
             nt_config_source.update(config)
             output_publisher.send_heartbeat()
+            update_snapshot(config, snapshot)
 
             if not decks:
                 output_publisher.send_connected(False)
@@ -84,7 +102,7 @@ def main(running: Callable[[], bool]):
 
                 print(f"Creating controller for {deck.deck_type()}")
 
-                controller = StreamDeckController(deck, config, output_publisher, DEFAULT_ASSETS_PATH)
+                controller = StreamDeckController(deck, config, output_publisher, DEFAULT_ASSETS_PATH, snapshot, recorder)
                 with controller and controller:
                     output_publisher.send_connected(True)
 
@@ -96,6 +114,7 @@ def main(running: Callable[[], bool]):
                             controller.update()
                         except TransportError:
                             pass
+                        update_snapshot(config, snapshot)
 
                         new_time = time.time()
                         d_time = new_time - last_time
@@ -107,6 +126,10 @@ def main(running: Callable[[], bool]):
             sent_search_message = False
     finally:
         # Clean up resources to prevent connection leaks
+        snapshot.flush(force=True)
+        if recorder is not None:
+            recorder.close()
+
         print("Cleaning up NetworkTables resources...")
         output_publisher.cleanup()
         nt_config_source.cleanup()
@@ -8,6 +8,13 @@ import constants
 if constants.DO_SIM:
     from nt_instances import nt_instance_sim
 
+BUTTON_TOPIC_PREFIX = "StreamDeck/"
+
+
+def button_topic_name(key: str) -> str:
+    """NT topic a button's pressed state is published to"""
+    return BUTTON_TOPIC_PREFIX + key
+
 
 class OutputPublisher:
     def send_connected(self, connected: bool):
@@ -66,7 +73,7 @@ class NTOutputPublisher(OutputPublisher):
                         key,
                         (
                             nt_instance
-                            .getBooleanTopic("StreamDeck/"+key)
+                            .getBooleanTopic(button_topic_name(key))
                             .publish(NTOutputPublisher.PRESSED_PUBLISH_OPTIONS)
                             if key
                             else None
@@ -83,7 +90,7 @@ class NTOutputPublisher(OutputPublisher):
                             key,
                             (
                                 nt_instance_sim
-                                .getBooleanTopic("StreamDeck/"+key)
+                                .getBooleanTopic(button_topic_name(key))
                                 .publish(NTOutputPublisher.PRESSED_PUBLISH_OPTIONS)
                                 if key
                                 else None
@@ -101,7 +108,7 @@ class NTOutputPublisher(OutputPublisher):
                 pub.key = config.key
                 pub.selected = (
                     nt_instance
-                    .getBooleanTopic("StreamDeck/"+pub.key)
+                    .getBooleanTopic(button_topic_name(pub.key))
                     .publish(NTOutputPublisher.PRESSED_PUBLISH_OPTIONS)
                 )
         if constants.DO_SIM:
@@ -113,7 +120,7 @@ class NTOutputPublisher(OutputPublisher):
                     pub.key = config.key
                     pub.selected = (
                         nt_instance_sim
-                        .getBooleanTopic("StreamDeck/"+pub.key)
+                        .getBooleanTopic(button_topic_name(pub.key))
                         .publish(NTOutputPublisher.PRESSED_PUBLISH_OPTIONS)
                     )
 
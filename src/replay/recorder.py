@@ -0,0 +1,103 @@
+import struct
+import threading
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import BinaryIO, Iterator
+
+import ntcore
+
+LOG_MAGIC = b"SDRL"
+LOG_VERSION = 1
+
+# Header: magic, version
+_HEADER = struct.Struct("<4sH")
+# Record: event type, nanoseconds since recording started, button/key index, payload length
+_RECORD = struct.Struct("<BqHH")
+
+
+class EventType(IntEnum):
+    APPEARANCE = 0
+    SELECTED = 1
+    KEY = 2
+
+
+@dataclass
+class ReplayEvent:
+    event_type: EventType
+    time_ns: int
+    index: int
+    appearance: str = ""
+    state: bool = False
+
+
+class Recorder:
+    """Captures NT appearance/selection updates and deck key events into a compact binary log"""
+
+    BUTTON_PREFIX = "/StreamDeck/Button/"
+
+    def __init__(self, path: str):
+        self._file = open(path, "wb")  # pylint: disable=consider-using-with
+        self._file.write(_HEADER.pack(LOG_MAGIC, LOG_VERSION))
+        # Values arrive on the NT listener thread while key events come from the deck reader thread
+        self._lock = threading.Lock()
+        # Microseconds on the NT clock, the same clock value timestamps use
+        self._start_time = ntcore._now()  # pylint: disable=protected-access
+        self._instance: ntcore.NetworkTableInstance | None = None
+        self._listener: int | None = None
+
+    def listen(self, instance: ntcore.NetworkTableInstance):
+        """Records every button value update NT delivers, stamped with the value's own timestamp"""
+        self._instance = instance
+        self._listener = instance.addListener([Recorder.BUTTON_PREFIX], ntcore.EventFlags.kValueAll, self._on_value)
+
+    def _on_value(self, event: ntcore.Event):
+        name = event.data.topic.getName()
+        index, _, field = name[len(Recorder.BUTTON_PREFIX):].partition("/")
+        if not index.isdigit():
+            return
+        value = event.data.value
+        if field == "Appearance" and value.isString():
+            self._write(EventType.APPEARANCE, int(index), value.time(), value.getString().encode("utf-8"))
+        elif field == "Selected" and value.isBoolean():
+            self._write(EventType.SELECTED, int(index), value.time(), bytes((value.getBoolean(),)))
+
+    def _write(self, event_type: EventType, index: int, time_us: int, payload: bytes):
+        # Values that were already set when recording started are stamped at the start
+        time_ns = max(0, time_us - self._start_time) * 1000
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(_RECORD.pack(event_type, time_ns, index, len(payload)) + payload)
+
+    def record_key(self, key: int, pressed: bool):
+        self._write(EventType.KEY, key, ntcore._now(), bytes((pressed,)))  # pylint: disable=protected-access
+
+    def close(self):
+        if self._listener is not None:
+            self._instance.removeListener(self._listener)
+            self._listener = None
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_events(file: BinaryIO) -> Iterator[ReplayEvent]:
+    magic, version = _HEADER.unpack(file.read(_HEADER.size))
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError(f"Unsupported replay log (magic {magic!r}, version {version})")
+
+    while True:
+        header = file.read(_RECORD.size)
+        if len(header) < _RECORD.size:
+            # A truncated trailing record means the recording was interrupted, keep what was complete
+            return
+        event_type, time_ns, index, length = _RECORD.unpack(header)
+        payload = file.read(length)
+        if len(payload) < length:
+            return
+
+        event_type = EventType(event_type)
+        if event_type == EventType.APPEARANCE:
+            yield ReplayEvent(event_type, time_ns, index, appearance=payload.decode("utf-8"))
+        else:
+            yield ReplayEvent(event_type, time_ns, index, state=bool(payload[0]))
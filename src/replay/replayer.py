@@ -0,0 +1,231 @@
+"""Replays a recorded session against a dummy Stream Deck and reports latency distributions.
+
+Run from the src directory:
+    python -m replay.replayer session.sdrl [--fast]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Callable
+
+import ntcore
+from StreamDeck.DeviceManager import DeviceManager
+from config.config_source import NTConfigSource
+from config.config_store import ButtonConfig, ConfigStore
+from controller.stream_deck import StreamDeckController
+from nt_instances import nt_instance
+from output.output_publisher import BUTTON_TOPIC_PREFIX, NTOutputPublisher, button_topic_name
+from replay.recorder import EventType, ReplayEvent, read_events
+
+DEFAULT_ASSETS_PATH = os.path.join(os.path.dirname(__file__), "../../assets")
+REPLAY_PORT = 5811
+MIN_LOOP_TIME = 0.02
+PENDING_TIMEOUT = 1.0
+CONNECT_TIMEOUT = 5.0
+
+
+class LatencyDeck:
+    """Wraps a dummy deck, timing how long each injected change takes to reach the key images"""
+
+    def __init__(self, deck):
+        self._deck = deck
+        self.key_callback = None
+        # key index -> (event type, time the oldest unreflected change was injected)
+        self.pending: dict[int, tuple[EventType, float]] = dict()
+        self.latencies: dict[EventType, list[float]] = {EventType.APPEARANCE: [], EventType.SELECTED: []}
+        self.writes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._deck, name)
+
+    def set_key_callback(self, callback):
+        self.key_callback = callback
+
+    def set_key_image(self, key, image):
+        self.writes += 1
+        self._deck.set_key_image(key, image)
+        if key in self.pending:
+            event_type, inject_time = self.pending.pop(key)
+            self.latencies[event_type].append(time.perf_counter() - inject_time)
+
+
+class Replayer:
+    def __init__(self, events: list[ReplayEvent], fast: bool):
+        self._events = events
+        self._fast = fast
+        self._num_buttons = max((e.index + 1 for e in events if e.event_type != EventType.KEY), default=32)
+        self._server = ntcore.NetworkTableInstance.create()
+        self._appearances: dict[int, ntcore.StringPublisher] = dict()
+        self._selected: dict[int, ntcore.BooleanPublisher] = dict()
+        self._poller = ntcore.NetworkTableListenerPoller(self._server)
+        # topic name -> times of key events whose publish has not reached the server yet
+        self._pending_keys: dict[str, list[float]] = dict()
+        self.key_latencies: list[float] = []
+        self.update_times: list[float] = []
+        self.unreflected = 0
+        self.no_ops = 0
+        # Button state as last injected, to tell when NTConfigSource has caught up with a change
+        self._expected = [ButtonConfig() for _ in range(self._num_buttons)]
+        # Called with the controller after every loop iteration
+        self.on_tick: Callable[[StreamDeckController], None] | None = None
+
+    def _start_server(self, persist_dir: str):
+        self._server.startServer(
+            persist_filename=os.path.join(persist_dir, "networktables.json"),
+            listen_address="127.0.0.1",
+            port4=REPLAY_PORT,
+        )
+        self._poller.addListener([BUTTON_TOPIC_PREFIX], ntcore.EventFlags.kValueRemote)
+        deck_table = self._server.getTable("StreamDeck")
+        for i in range(self._num_buttons):
+            table = deck_table.getSubTable(f"Button/{i}")
+            self._appearances[i] = table.getStringTopic("Appearance").publish()
+            self._selected[i] = table.getBooleanTopic("Selected").publish()
+
+        nt_instance.setServer("127.0.0.1", REPLAY_PORT)
+        nt_instance.startClient4("replay")
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while not nt_instance.isConnected():
+            if time.monotonic() > deadline:
+                raise RuntimeError("Replay client could not connect to the local NT server")
+            time.sleep(0.01)
+
+    def _inject(self, event: ReplayEvent, deck: LatencyDeck, config: ConfigStore):
+        now = time.perf_counter()
+        if event.event_type == EventType.APPEARANCE:
+            self._appearances[event.index].set(event.appearance)
+            self._expected[event.index].set_appearance(event.appearance)
+            deck.pending.setdefault(event.index, (EventType.APPEARANCE, now))
+        elif event.event_type == EventType.SELECTED:
+            self._selected[event.index].set(event.state)
+            self._expected[event.index].selected = event.state
+            deck.pending.setdefault(event.index, (EventType.SELECTED, now))
+        elif deck.key_callback is not None:
+            if event.index < len(config.buttons) and config.buttons[event.index].key:
+                topic = button_topic_name(config.buttons[event.index].key)
+                self._pending_keys.setdefault(topic, []).append(now)
+            deck.key_callback(deck, event.index, event.state)
+        self._server.flush()
+
+    def _poll_published_keys(self):
+        now = time.perf_counter()
+        for event in self._poller.readQueue():
+            times = self._pending_keys.get(event.data.topic.getName())
+            if times:
+                self.key_latencies.append(now - times.pop(0))
+
+    def _drop_no_ops(self, deck: LatencyDeck, config: ConfigStore):
+        """Stops timing changes that reached the config but correctly left the key image unchanged"""
+        for key in list(deck.pending):
+            if key < len(config.buttons) and config.buttons[key] == self._expected[key]:
+                del deck.pending[key]
+                self.no_ops += 1
+
+    def _expire_pending(self, deck: LatencyDeck) -> bool:
+        """Drops changes that never produced a new key image, returns whether any are still outstanding"""
+        now = time.perf_counter()
+        for key, (_, inject_time) in list(deck.pending.items()):
+            if now - inject_time > PENDING_TIMEOUT:
+                del deck.pending[key]
+                self.unreflected += 1
+        for times in self._pending_keys.values():
+            while times and now - times[0] > PENDING_TIMEOUT:
+                times.pop(0)
+                self.unreflected += 1
+        return bool(deck.pending) or any(self._pending_keys.values())
+
+    def run(self, deck: LatencyDeck):
+        config = ConfigStore()
+        config.asset_directory = DEFAULT_ASSETS_PATH
+        nt_config_source = NTConfigSource(self._num_buttons)
+        output_publisher = NTOutputPublisher(config, self._num_buttons)
+        controller = StreamDeckController(deck, config, output_publisher, DEFAULT_ASSETS_PATH)
+
+        with tempfile.TemporaryDirectory() as persist_dir:
+            self._start_server(persist_dir)
+            nt_config_source.update(config)
+            try:
+                with controller:
+                    self._loop(deck, config, nt_config_source, output_publisher, controller)
+            finally:
+                output_publisher.cleanup()
+                nt_config_source.cleanup()
+                nt_instance.stopClient()
+                self._server.stopServer()
+
+    def _loop(self, deck, config, nt_config_source, output_publisher, controller):
+        index = 0
+        start_time = time.perf_counter()
+        # In fast mode the replay clock skips ahead whenever nothing is left to measure
+        offset = 0.0
+        while index < len(self._events) or self._expire_pending(deck):
+            elapsed = time.perf_counter() - start_time + offset
+            if self._fast and index < len(self._events) and not self._expire_pending(deck):
+                offset += max(0.0, self._events[index].time_ns / 1e9 - elapsed)
+                elapsed = time.perf_counter() - start_time + offset
+            while index < len(self._events) and self._events[index].time_ns / 1e9 <= elapsed:
+                self._inject(self._events[index], deck, config)
+                index += 1
+
+            loop_start = time.perf_counter()
+            nt_config_source.update(config)
+            output_publisher.send_heartbeat()
+            update_start = time.perf_counter()
+            controller.update()
+            self.update_times.append(time.perf_counter() - update_start)
+            self._drop_no_ops(deck, config)
+            self._poll_published_keys()
+            if self.on_tick is not None:
+                self.on_tick(controller)
+
+            if not self._fast:
+                d_time = time.perf_counter() - loop_start
+                if d_time < MIN_LOOP_TIME:
+                    time.sleep(MIN_LOOP_TIME - d_time)
+
+
+def format_distribution(name: str, samples: list[float]) -> str:
+    if not samples:
+        return f"{name:<22} no samples"
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return (
+        f"{name:<22} n={len(ordered):<6} min={ordered[0] * 1000:7.2f}ms p50={percentile(0.5):7.2f}ms "
+        f"p90={percentile(0.9):7.2f}ms p99={percentile(0.99):7.2f}ms max={ordered[-1] * 1000:7.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="replay log written with SD_RECORD_PATH")
+    parser.add_argument("--fast", action="store_true", help="replay as fast as possible instead of in real time")
+    args = parser.parse_args()
+
+    with open(args.log, "rb") as f:
+        # Values are stamped by NT and key presses by the deck thread, so file order can differ slightly
+        events = sorted(read_events(f), key=lambda e: e.time_ns)
+    print(f"Loaded {len(events)} events spanning {events[-1].time_ns / 1e9 if events else 0:.1f}s")
+
+    dummy_decks = [d for d in DeviceManager(transport="dummy").enumerate() if d.is_visual()]
+    deck = LatencyDeck(max(dummy_decks, key=lambda d: d.key_count()))
+
+    replayer = Replayer(events, args.fast)
+    replay_start = time.perf_counter()
+    replayer.run(deck)
+    print(f"Replayed in {time.perf_counter() - replay_start:.1f}s on {deck.deck_type()}, {deck.writes} key writes")
+
+    print(format_distribution("appearance -> image", deck.latencies[EventType.APPEARANCE]))
+    print(format_distribution("selected -> image", deck.latencies[EventType.SELECTED]))
+    print(format_distribution("key -> publish", replayer.key_latencies))
+    print(format_distribution("controller update", replayer.update_times))
+    print(f"{replayer.no_ops} changes left the key image unchanged")
+    print(f"{replayer.unreflected} changes were not reflected in a key image or publish within {PENDING_TIMEOUT}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Long-running soak benchmark tracking process memory while replaying synthetic match traffic.
+
+Run from the src directory:
+    python -m replay.soak --duration 3600 [--fast] [--tracemalloc]
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+import psutil
+from StreamDeck.DeviceManager import DeviceManager
+from config.config_store import APPEARANCE_SEPARATOR
+from controller.stream_deck import StreamDeckController
+from replay.recorder import EventType, ReplayEvent
+from replay.replayer import LatencyDeck, Replayer
+
+NUM_BUTTONS = 32
+# Includes spellings of the same color so canonicalization is exercised too
+COLORS = ["", "#fff", "#FFFFFF", "white", "#000000", "black", "#FF7A1C", "#209299", "red", "#00FF00"]
+
+
+def current_rss() -> int:
+    return psutil.Process().memory_info().rss
+
+
+def synthetic_events(duration: float, rate: float, seed: int) -> list[ReplayEvent]:
+    """Bursts of selection toggles, a steady trickle of new labels and key presses"""
+    rng = random.Random(seed)
+    events = []
+    labels = 0
+    for i in range(NUM_BUTTONS):
+        events.append(ReplayEvent(EventType.APPEARANCE, 0, i, appearance=appearance(rng, i, labels)))
+
+    time_ns = 0
+    while time_ns < duration * 1e9:
+        time_ns += int(rng.expovariate(rate) * 1e9)
+        index = rng.randrange(NUM_BUTTONS)
+        roll = rng.random()
+        if roll < 0.7:
+            events.append(ReplayEvent(EventType.SELECTED, time_ns, index, state=rng.random() < 0.5))
+        elif roll < 0.95:
+            # Labels keep growing over the session, like a robot reporting changing state text
+            labels += rng.random() < 0.2
+            events.append(ReplayEvent(EventType.APPEARANCE, time_ns, index, appearance=appearance(rng, index, labels)))
+        else:
+            events.append(ReplayEvent(EventType.KEY, time_ns, index, state=True))
+            events.append(ReplayEvent(EventType.KEY, time_ns + 50_000_000, index, state=False))
+    events.sort(key=lambda e: e.time_ns)
+    return events
+
+
+def appearance(rng: random.Random, index: int, labels: int) -> str:
+    return APPEARANCE_SEPARATOR.join(
+        [
+            f"Button{index}",
+            rng.choice(COLORS),
+            rng.choice(COLORS),
+            rng.choice(COLORS),
+            rng.choice(COLORS),
+            f"Auto {rng.randrange(labels + 1)}",
+            f"Button {index}",
+        ]
+    )
+
+
+class MemorySampler:
+    def __init__(self, interval: float, use_tracemalloc: bool):
+        self._interval = interval
+        self._use_tracemalloc = use_tracemalloc
+        self._start_time = time.monotonic()
+        self._next_sample = self._start_time
+        self.samples: list[tuple[float, int, int, int, int, int, int]] = []
+
+    def __call__(self, controller: StreamDeckController):
+        now = time.monotonic()
+        if now < self._next_sample:
+            return
+        self._next_sample = now + self._interval
+
+        cache_entries, cache_keys, cache_bytes = controller.icon_cache_size()
+        traced = tracemalloc.get_traced_memory()[0] if self._use_tracemalloc else 0
+        sample = (
+            now - self._start_time,
+            current_rss(),
+            sys.getallocatedblocks(),
+            traced,
+            cache_entries,
+            cache_keys,
+            cache_bytes,
+        )
+        self.samples.append(sample)
+        print(format_sample(sample), flush=True)
+
+
+def format_sample(sample) -> str:
+    elapsed, rss, blocks, traced, cache_entries, cache_keys, cache_bytes = sample
+    return (
+        f"t={elapsed:8.1f}s rss={rss / 2**20:8.1f}MB blocks={blocks:9d} traced={traced / 2**20:7.1f}MB "
+        f"icon_cache={cache_entries:5d} frames/{cache_keys:5d} keys/{cache_bytes / 2**20:5.2f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3600, help="seconds of synthetic traffic")
+    parser.add_argument("--rate", type=float, default=50, help="average NT changes per second")
+    parser.add_argument("--interval", type=float, default=10, help="seconds between memory samples")
+    parser.add_argument("--seed", type=int, default=3476)
+    parser.add_argument("--fast", action="store_true", help="replay as fast as possible instead of in real time")
+    parser.add_argument("--tracemalloc", action="store_true", help="also track Python allocations (slower)")
+    args = parser.parse_args()
+
+    events = synthetic_events(args.duration, args.rate, args.seed)
+    print(f"Generated {len(events)} events over {args.duration:.0f}s")
+
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    dummy_decks = [d for d in DeviceManager(transport="dummy").enumerate() if d.is_visual()]
+    deck = LatencyDeck(max(dummy_decks, key=lambda d: d.key_count()))
+
+    sampler = MemorySampler(args.interval, args.tracemalloc)
+    replayer = Replayer(events, args.fast)
+    replayer.on_tick = sampler
+    replayer.run(deck)
+
+    if len(sampler.samples) < 2:
+        print("Not enough samples to report growth")
+        return
+    # Skip the first tenth of the run so caches and NT have warmed up
+    baseline = sampler.samples[len(sampler.samples) // 10]
+    final = sampler.samples[-1]
+    print("baseline " + format_sample(baseline))
+    print("final    " + format_sample(final))
+    print(f"RSS growth {(final[1] - baseline[1]) / 2**20:+.1f}MB")
+    print(f"Allocated block growth {final[2] - baseline[2]:+d}")
+    print(
+        f"{deck.writes} key writes, {replayer.no_ops} changes left the image unchanged, "
+        f"{replayer.unreflected} were not reflected"
+    )
+
+
+if __name__ == "__main__":
+    main()
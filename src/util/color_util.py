@@ -0,0 +1,20 @@
+from functools import lru_cache
+
+from PIL import ImageColor
+
+
+@lru_cache(maxsize=256)
+def parse_color(color: str) -> int | None:
+    """Canonicalizes any PIL color string ("#fff", "#FFFFFF", "white", ...) to packed 0xRRGGBB, None if unset or invalid"""
+    if not color:
+        return None
+    try:
+        rgb = ImageColor.getrgb(color)
+    except ValueError:
+        print(f"Ignoring invalid color {color!r}")
+        return None
+    return (rgb[0] << 16) | (rgb[1] << 8) | rgb[2]
+
+
+def to_rgb(color: int) -> tuple[int, int, int]:
+    return ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
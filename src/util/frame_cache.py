@@ -0,0 +1,88 @@
+import hashlib
+from collections import OrderedDict
+from typing import Hashable
+
+
+def frame_id(frame: bytes) -> bytes:
+    """Content hash identifying an encoded key image"""
+    return hashlib.blake2b(frame, digest_size=16).digest()
+
+
+class FrameCache:
+    """Content-addressed store of encoded key images, evicting the least recently used past a byte budget
+    and a render key budget"""
+
+    def __init__(self, max_bytes: int, max_keys: int):
+        self._max_bytes = max_bytes
+        self._max_keys = max_keys
+        self._frames: OrderedDict[bytes, bytes] = OrderedDict()
+        # render key -> frame id, and the reverse so lookups can be dropped with their frame
+        self._lookup: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._keys: dict[bytes, set[Hashable]] = dict()
+        self._size_bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    @property
+    def key_count(self) -> int:
+        return len(self._lookup)
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def get(self, key: Hashable) -> tuple[bytes, bytes] | None:
+        """Returns (frame id, encoded frame) previously stored for a render key"""
+        fid = self._lookup.get(key)
+        if fid is None:
+            return None
+        self._lookup.move_to_end(key)
+        self._frames.move_to_end(fid)
+        return fid, self._frames[fid]
+
+    def put(self, key: Hashable, frame: bytes) -> tuple[bytes, bytes]:
+        frame = bytes(frame)
+        fid = frame_id(frame)
+        if fid in self._frames:
+            # Identical bytes from a different render key share the existing entry
+            self._frames.move_to_end(fid)
+            frame = self._frames[fid]
+        else:
+            self._frames[fid] = frame
+            self._keys[fid] = set()
+            self._size_bytes += len(frame)
+        old_fid = self._lookup.get(key)
+        if old_fid == fid:
+            self._lookup.move_to_end(key)
+        else:
+            if old_fid is not None:
+                # The key now renders differently, stop it holding on to its old frame
+                self._unlink(key, old_fid)
+            self._lookup[key] = fid
+            self._keys[fid].add(key)
+
+        # Always keep the newest frame and key, even if they alone are over budget
+        while len(self._lookup) > self._max_keys and len(self._lookup) > 1:
+            self._evict_key()
+        while self._size_bytes > self._max_bytes and len(self._frames) > 1:
+            self._evict_frame(next(iter(self._frames)))
+        return fid, frame
+
+    def _evict_key(self):
+        key, fid = next(iter(self._lookup.items()))
+        self._unlink(key, fid)
+
+    def _unlink(self, key: Hashable, fid: bytes):
+        del self._lookup[key]
+        keys = self._keys[fid]
+        keys.discard(key)
+        if not keys:
+            # Nothing can look the frame up any more
+            self._evict_frame(fid)
+
+    def _evict_frame(self, fid: bytes):
+        frame = self._frames.pop(fid)
+        self._size_bytes -= len(frame)
+        for key in self._keys.pop(fid):
+            del self._lookup[key]
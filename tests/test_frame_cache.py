@@ -0,0 +1,68 @@
+from util.frame_cache import FrameCache, frame_id
+
+
+def test_identical_frames_share_one_entry():
+    cache = FrameCache(max_bytes=1024, max_keys=16)
+    white = cache.put((0xFFFFFF, 0, ""), b"frame")
+    other = cache.put((0xFFFFFF, 0, "same pixels"), b"frame")
+
+    assert white == other == (frame_id(b"frame"), b"frame")
+    assert len(cache) == 1
+    assert cache.key_count == 2
+    assert cache.size_bytes == len(b"frame")
+
+
+def test_put_repoints_key_and_drops_orphaned_frame():
+    cache = FrameCache(max_bytes=1024, max_keys=16)
+    cache.put("key", b"old")
+    fid, frame = cache.put("key", b"new")
+
+    assert cache.get("key") == (fid, frame) == (frame_id(b"new"), b"new")
+    assert len(cache) == 1
+    assert cache.size_bytes == len(b"new")
+
+
+def test_put_repoint_keeps_frame_shared_with_other_keys():
+    cache = FrameCache(max_bytes=1024, max_keys=16)
+    cache.put("a", b"shared")
+    cache.put("b", b"shared")
+    cache.put("a", b"new")
+
+    assert cache.get("b") == (frame_id(b"shared"), b"shared")
+    assert len(cache) == 2
+
+
+def test_byte_budget_evicts_least_recently_used_frame():
+    cache = FrameCache(max_bytes=8, max_keys=16)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.get("a")
+    cache.put("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.size_bytes == 8
+
+
+def test_key_budget_evicts_keys_and_unreferenced_frames():
+    cache = FrameCache(max_bytes=1024, max_keys=2)
+    for i in range(5):
+        cache.put(("blank", i), b"blank")
+    cache.put("x", b"x")
+
+    assert cache.key_count == 2
+    assert len(cache) == 2
+
+    cache.put("y", b"y")
+    assert cache.get(("blank", 4)) is None
+    assert len(cache) == 2
+    assert cache.size_bytes == 2
+
+
+def test_newest_frame_is_kept_even_over_budget():
+    cache = FrameCache(max_bytes=2, max_keys=16)
+    fid, frame = cache.put("big", b"larger than budget")
+
+    assert cache.get("big") == (fid, frame)
+    assert len(cache) == 1